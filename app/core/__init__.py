@@ -1 +1,8 @@
-from .config import settings
\ No newline at end of file
+from .config import get_settings
+
+
+def __getattr__(name: str):
+    # `settings` отдаём лениво, чтобы импорт пакета не читал окружение
+    if name == "settings":
+        return get_settings()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,23 +1,39 @@
-from pydantic_settings import BaseSettings
-from pydantic import Field, PostgresDsn, SecretStr, validator
-from functools import lru_cache
-from typing import Optional, List
+from pydantic_settings import BaseSettings, SettingsConfigDict, NoDecode
+from pydantic import Field, PostgresDsn, SecretStr, field_validator, model_validator
+from functools import lru_cache, cached_property
+import json
+from typing import Optional, List, Annotated, Literal
+
+# Общий конфиг для всех секций; frozen - настройки не меняются после загрузки
+ENV_CONFIG = SettingsConfigDict(
+    env_file=".env",
+    env_file_encoding="utf-8",
+    case_sensitive=False,
+    extra="ignore",
+    frozen=True,
+)
 
 
 class DatabaseSettings(BaseSettings):
+    model_config = ENV_CONFIG
+
     user: str = Field(..., alias="DB_POSTGRES_USER")
     password: SecretStr = Field(..., alias="DB_POSTGRES_PASSWORD")
     db: str = Field(..., alias="DB_POSTGRES_DB")
     host: str = Field("db", alias="DB_POSTGRES_HOST")
     port: int = Field(5432, alias="DB_POSTGRES_PORT")
     
-    pool_size: int = Field(5, alias="POOL_SIZE")
+    pool_size: int = Field(20, alias="POOL_SIZE")
     max_overflow: int = Field(10, alias="MAX_OVERFLOW")
     pool_timeout: int = Field(30, alias="POOL_TIMEOUT")
+    pool_recycle: int = Field(1800, alias="POOL_RECYCLE")
+    # За PgBouncer в режиме transaction pooling лучше выключить
+    pool_pre_ping: bool = Field(True, alias="POOL_PRE_PING")
     echo_sql: bool = Field(False, alias="ECHO_SQL")
 
-    @property
+    @cached_property
     def async_url(self) -> str:
+        # Собирается один раз: DSN заново валидируется при каждом build()
         return str(PostgresDsn.build(
             scheme="postgresql+asyncpg",
             username=self.user,
@@ -27,13 +43,16 @@ class DatabaseSettings(BaseSettings):
             path=self.db or ""  # Убираем добавление слеша
             ))
 
-    @validator('port', pre=True)
+    @field_validator("port", mode="before")
+    @classmethod
     def parse_port(cls, v):
         if isinstance(v, str):
             return int(v.strip('"\' '))  # Удаляем возможные кавычки и пробелы
         return v
 
 class AuthSettings(BaseSettings):
+    model_config = ENV_CONFIG
+
     secret_key: SecretStr = Field(..., alias="SECRET_KEY")
     algorithm: str = Field("HS256", alias="ALGORITHM")
     access_token_expire_minutes: int = Field(30, alias="ACCESS_TOKEN_EXPIRE_MINUTES")
@@ -46,6 +65,8 @@ class AuthSettings(BaseSettings):
     #frontend_url: str = Field(..., alias="FRONTEND_URL")
 
 class YandexOAuthSettings(BaseSettings):
+    model_config = ENV_CONFIG
+
     client_id: str = Field(..., alias="YANDEX_CLIENT_ID")
     client_secret: SecretStr = Field(..., alias="YANDEX_CLIENT_SECRET")
     redirect_uri: str = Field("http://localhost:8000/auth/yandex/callback", alias="YANDEX_REDIRECT_URI")
@@ -54,37 +75,103 @@ class YandexOAuthSettings(BaseSettings):
     auth_url: str = Field("https://oauth.yandex.ru/authorize", alias="YANDEX_AUTH_URL")
 
 class AppSettings(BaseSettings):
+    model_config = ENV_CONFIG
+
     project_name: str = Field(..., alias="PROJECT_NAME")
     debug: bool = Field(False, alias="DEBUG")
 
     environment: str = Field("production", alias="APP_ENV")
     cors_origins: list[str] = ["*"]
 
-    @validator("debug", pre=True)
+    @field_validator("debug", mode="before")
+    @classmethod
     def parse_debug(cls, v):
         if isinstance(v, str):
             return v.lower() in ("true", "1", "yes")
         return bool(v)
 
 class AudioSettings(BaseSettings):
+    model_config = ENV_CONFIG
+
+    # Каталог для загруженных файлов; создаётся один раз при старте приложения
+    upload_dir: str = Field("uploads", alias="AUDIO_UPLOAD_DIR")
     max_file_size: int = 10_000_000  # 10MB
-    allowed_types: list[str] = ["audio/mpeg", "audio/wav"]
+    # Пакетная загрузка: не больше файлов и суммарных байт за один запрос
+    max_batch_files: int = Field(20, alias="MAX_BATCH_FILES")
+    max_batch_size: int = Field(100_000_000, alias="MAX_BATCH_SIZE")  # 100MB
+    # Сколько загрузок одновременно пишут на диск; остальные ждут очереди
+    max_concurrent_uploads: int = Field(16, alias="MAX_CONCURRENT_UPLOADS")
+    # Linux: копировать уже сброшенные на диск загрузки через sendfile в ядре
+    kernel_copy_uploads: bool = Field(False, alias="KERNEL_COPY_UPLOADS")
+    # Дочистка мягко удалённых файлов: период прохода и возраст строк, секунды
+    purge_interval: int = Field(3600, alias="AUDIO_PURGE_INTERVAL")
+    purge_grace: int = Field(600, alias="AUDIO_PURGE_GRACE")
+    # Где лежат байты файлов: локальный диск или S3-совместимое хранилище (MinIO)
+    storage_backend: Literal["local", "s3"] = Field("local", alias="AUDIO_STORAGE_BACKEND")
+    s3_bucket: Optional[str] = Field(None, alias="S3_BUCKET")
+    s3_endpoint_url: Optional[str] = Field(None, alias="S3_ENDPOINT_URL")
+    s3_region: Optional[str] = Field(None, alias="S3_REGION")
+    # Без ключей boto берёт учётные данные из своей стандартной цепочки
+    s3_access_key_id: Optional[str] = Field(None, alias="S3_ACCESS_KEY_ID")
+    s3_secret_access_key: Optional[SecretStr] = Field(None, alias="S3_SECRET_ACCESS_KEY")
+    s3_max_pool_connections: int = Field(50, alias="S3_MAX_POOL_CONNECTIONS")
+    # Время жизни presigned-ссылки на скачивание, секунды
+    s3_presign_ttl: int = Field(300, alias="S3_PRESIGN_TTL")
+    # NoDecode: из env принимаем и CSV ("audio/mpeg,audio/wav"), и JSON-список
+    allowed_types: Annotated[frozenset[str], NoDecode] = frozenset({"audio/mpeg", "audio/wav"})
+
+    @field_validator("allowed_types", mode="before")
+    @classmethod
+    def parse_allowed_types(cls, v):
+        if isinstance(v, str):
+            if v.lstrip().startswith("["):
+                return frozenset(json.loads(v))
+            return frozenset(t.strip() for t in v.split(",") if t.strip())
+        return frozenset(v)
+
+    @model_validator(mode="after")
+    def check_s3(self):
+        if self.storage_backend == "s3" and not self.s3_bucket:
+            raise ValueError("S3_BUCKET is required when AUDIO_STORAGE_BACKEND=s3")
+        return self
+
+    @cached_property
+    def allowed_types_display(self) -> str:
+        return ", ".join(sorted(self.allowed_types))
 
 
 class Settings(BaseSettings):
-    app: AppSettings = AppSettings()
-    database: DatabaseSettings = DatabaseSettings()
-    auth: AuthSettings = AuthSettings()
-    yandex: YandexOAuthSettings = YandexOAuthSettings()
-    
-    class Config:
-        env_file = ".env"
-        env_file_encoding = "utf-8"
-        case_sensitive = False  # Для совместимости
-        extra = "ignore"
+    model_config = ENV_CONFIG
+
+    # Секции собираются в build_sections при создании Settings(),
+    # а не при определении класса
+    app: Optional[AppSettings] = None
+    database: Optional[DatabaseSettings] = None
+    auth: Optional[AuthSettings] = None
+    yandex: Optional[YandexOAuthSettings] = None
+    audio: Optional[AudioSettings] = None
+
+    @model_validator(mode="after")
+    def build_sections(self):
+        # Модель frozen, поэтому секции выставляем в обход __setattr__
+        if self.app is None:
+            object.__setattr__(self, "app", AppSettings())
+        if self.database is None:
+            object.__setattr__(self, "database", DatabaseSettings())
+        if self.auth is None:
+            object.__setattr__(self, "auth", AuthSettings())
+        if self.yandex is None:
+            object.__setattr__(self, "yandex", YandexOAuthSettings())
+        if self.audio is None:
+            object.__setattr__(self, "audio", AudioSettings())
+        return self
 
-@lru_cache()
+@lru_cache(maxsize=1)
 def get_settings() -> Settings:
     return Settings()
 
-settings = get_settings()
\ No newline at end of file
+def __getattr__(name: str):
+    # Ленивый `settings` (PEP 562): окружение читается при первом обращении
+    if name == "settings":
+        return get_settings()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,6 +1,6 @@
 from typing import AsyncGenerator
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
-from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+from sqlalchemy.orm import declarative_base
 import logging
 from app.core.config import settings
 from sqlalchemy import text
@@ -15,13 +15,23 @@ try:
         settings.database.async_url,  # Используем async_url (метод) вместо ASYNC_URL
         pool_size=settings.database.pool_size,  # lowercase согласно классу DatabaseSettings
         max_overflow=settings.database.max_overflow,  # lowercase
+        pool_timeout=settings.database.pool_timeout,
+        pool_recycle=settings.database.pool_recycle,
+        pool_pre_ping=settings.database.pool_pre_ping,
         echo=settings.database.echo_sql,  # lowercase
-        pool_pre_ping=True,
+        # TCP keepalive, чтобы простаивающие соединения не рвались молча
+        connect_args={
+            "server_settings": {
+                "tcp_keepalives_idle": "60",
+                "tcp_keepalives_interval": "10",
+                "tcp_keepalives_count": "5",
+            }
+        },
         future=True
     )
     
-    async_session_maker = sessionmaker(
-        bind=engine,
+    async_session_maker = async_sessionmaker(
+        engine,
         class_=AsyncSession,
         expire_on_commit=False,
         autoflush=False
@@ -31,17 +41,21 @@ try:
     AsyncSessionLocal = async_session_maker
     
     logger.info(
-        f"Database connection established\n"
-        f"URL: {settings.database.async_url}\n"
-        f"Pool size: {settings.database.pool_size}, "
-        f"Max overflow: {settings.database.max_overflow}"
+        "Database connection established\n"
+        "URL: %s\n"
+        "Pool size: %s, Max overflow: %s",
+        settings.database.async_url,
+        settings.database.pool_size,
+        settings.database.max_overflow
     )
 
 except Exception as e:
     logger.error(
-        f"Database connection error: {e}\n"
-        f"Check your database settings in .env file\n"
-        f"Attempted connection URL: {settings.database.async_url}"
+        "Database connection error: %s\n"
+        "Check your database settings in .env file\n"
+        "Attempted connection URL: %s",
+        e,
+        settings.database.async_url
     )
     raise
 
@@ -49,14 +63,29 @@ async def get_async_session() -> AsyncGenerator[AsyncSession, None]:
     async with async_session_maker() as session:
         yield session
 
+# create_all не добавляет колонки в уже существующие таблицы; идемпотентные
+# ALTER для старых БД (то же, что в migrations/versions)
+SCHEMA_UPGRADES = [
+    "ALTER TABLE audio_files ADD COLUMN IF NOT EXISTS deleted_at TIMESTAMPTZ NULL",
+    "CREATE INDEX IF NOT EXISTS ix_audio_user_created ON audio_files (user_id, created_at, id)",
+    # Покрыты ix_audio_user_created и первичным ключом, только замедляют запись
+    "DROP INDEX IF EXISTS ix_audio_user_file",
+    "DROP INDEX IF EXISTS ix_audio_files_user_id",
+]
+
+async def upgrade_schema(conn):
+    for statement in SCHEMA_UPGRADES:
+        await conn.execute(text(statement))
+
 async def create_tables():
     try:
         async with engine.begin() as conn:
             await conn.execute(text('CREATE EXTENSION IF NOT EXISTS "uuid-ossp"'))
             await conn.run_sync(Base.metadata.create_all)
+            await upgrade_schema(conn)
         logger.info("Database tables created successfully")
     except Exception as e:
-        logger.error(f"Error creating tables: {e}")
+        logger.error("Error creating tables: %s", e)
         raise
 
 __all__ = ['Base', 'async_session_maker', 'AsyncSessionLocal', 'engine', 'create_tables', 'get_async_session']
\ No newline at end of file
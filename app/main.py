@@ -1,8 +1,12 @@
+import asyncio
 import sys
+from contextlib import asynccontextmanager, suppress
 from pathlib import Path
 import logging
+import httpx
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from fastapi.staticfiles import StaticFiles
 from dotenv import load_dotenv
 from app.routes import auth_router, users_router, audio_router, yandex_router
@@ -23,7 +27,7 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 # Проверка .env
-logger.info(f"Checking .env at: {ENV_PATH}")
+logger.info("Checking .env at: %s", ENV_PATH)
 if not ENV_PATH.exists():
     logger.error(".env file NOT FOUND!")
     raise RuntimeError("Missing .env file")
@@ -35,16 +39,66 @@ from app.core.config import settings
 STATIC_DIR = BASE_DIR / "static/audio_files"
 STATIC_DIR.mkdir(parents=True, exist_ok=True)
 
-# 6. Создание приложения
+# 6. Жизненный цикл: БД и общий HTTP-клиент
+async def startup_db():
+    """Инициализация базы данных при запуске"""
+    from app.db.session import Base, engine, upgrade_schema
+    from sqlalchemy import text
+    from sqlalchemy.exc import SQLAlchemyError
+    
+    try:
+        async with engine.begin() as conn:
+            await conn.execute(text('CREATE EXTENSION IF NOT EXISTS "uuid-ossp"'))
+            await conn.run_sync(Base.metadata.create_all)
+            await upgrade_schema(conn)
+        logger.info("Database tables initialized successfully")
+    except SQLAlchemyError as e:
+        logger.error("Database initialization failed: %s", e)
+        raise
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await startup_db()
+    from app.services.storage import close_s3, s3_enabled, start_s3
+    if s3_enabled():
+        await start_s3()
+    else:
+        # Каталог загрузок и его шарды создаются один раз здесь, а не на каждую загрузку
+        from app.services.audio import ensure_upload_dirs
+        await asyncio.to_thread(ensure_upload_dirs)
+    # Один клиент на процесс: keep-alive и HTTP/2 к *.yandex.ru
+    app.state.http = httpx.AsyncClient(
+        http2=True,
+        timeout=10.0,
+        limits=httpx.Limits(max_keepalive_connections=20, max_connections=100)
+    )
+    # Дочистка мягко удалённых файлов (после сбоев хранилища и перезапусков)
+    from app.services.audio import run_purge_sweeper
+    purge_task = asyncio.create_task(run_purge_sweeper())
+    try:
+        yield
+    finally:
+        purge_task.cancel()
+        with suppress(asyncio.CancelledError):
+            await purge_task
+        await app.state.http.aclose()
+        await close_s3()
+
+# 7. Создание приложения
 app = FastAPI(
     title=settings.app.project_name,
     version="1.0.0",
     debug=settings.app.debug,
     docs_url="/docs" if settings.app.debug else None,
-    redoc_url="/redoc" if settings.app.debug else None
+    redoc_url="/redoc" if settings.app.debug else None,
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan
 )
 
-# 7. Настройка CORS
+# 8. Лимит размера загрузок по Content-Length (до разбора multipart)
+#    и CORS; CORS добавлен последним, поэтому снаружи - и у 413 есть его заголовки
+from app.routes.audio import UploadSizeLimitMiddleware
+app.add_middleware(UploadSizeLimitMiddleware)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=settings.app.cors_origins,
@@ -53,32 +107,15 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# 8. Подключение статических файлов
+# 9. Подключение статических файлов
 app.mount("/static/audio_files", StaticFiles(directory=STATIC_DIR), name="audio_files")
 
-# 9. Регистрация роутеров
+# 10. Регистрация роутеров
 app.include_router(auth_router, prefix="/auth", tags=["auth"])
 app.include_router(users_router, prefix="/users", tags=["users"])
 app.include_router(audio_router, prefix="/audio", tags=["audio"])
 app.include_router(yandex_router, prefix="/auth/yandex", tags=["yandex-oauth"])
 
-# 10. Инициализация базы данных
-@app.on_event("startup")
-async def startup_db():
-    """Инициализация базы данных при запуске"""
-    from app.db.session import Base, engine
-    from sqlalchemy import text
-    from sqlalchemy.exc import SQLAlchemyError
-    
-    try:
-        async with engine.begin() as conn:
-            await conn.execute(text('CREATE EXTENSION IF NOT EXISTS "uuid-ossp"'))
-            await conn.run_sync(Base.metadata.create_all)
-        logger.info("Database tables initialized successfully")
-    except SQLAlchemyError as e:
-        logger.error(f"Database initialization failed: {str(e)}")
-        raise
-
 # 11. Health check endpoint
 @app.get("/health", include_in_schema=False)
 async def health_check():
@@ -97,8 +134,12 @@ async def root():
 # 13. Дополнительная обработка ошибок (например, для OAuth)
 @app.exception_handler(HTTPException)
 async def custom_http_exception_handler(request, exc: HTTPException):
-    logger.error(f"HTTPException occurred: {exc.detail}")
-    return {"detail": exc.detail, "status_code": exc.status_code}
+    logger.error("HTTPException occurred: %s", exc.detail)
+    return ORJSONResponse(
+        status_code=exc.status_code,
+        content={"detail": exc.detail, "status_code": exc.status_code},
+        headers=exc.headers
+    )
 
 if __name__ == "__main__":
     import uvicorn
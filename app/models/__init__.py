@@ -1,4 +1,5 @@
 from app.db.session import Base
 from .user import User
+from .audio import AudioFile
 
-__all__ = ['Base', 'User']
\ No newline at end of file
+__all__ = ['Base', 'User', 'AudioFile']
@@ -1,14 +1,29 @@
-from sqlalchemy import Column, String, ForeignKey
+from datetime import datetime
+from typing import Optional
+from sqlalchemy import String, BigInteger, DateTime, ForeignKey, Index, func
 from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.orm import Mapped, mapped_column
 import uuid
 
 from app.db.session import Base
 
 class AudioFile(Base):
     __tablename__ = "audio_files"
+    __table_args__ = (
+        # Список файлов пользователя, новые первыми (keyset по created_at, id);
+        # его префикс user_id заменяет отдельный индекс по user_id.
+        # Проверка владельца при скачивании/удалении идёт по первичному ключу id
+        Index("ix_audio_user_created", "user_id", "created_at", "id"),
+    )
 
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
-    filename = Column(String, nullable=False)
-    original_filename = Column(String, nullable=False)
-    file_path = Column(String, nullable=False)
\ No newline at end of file
+    id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    user_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("users.id"), nullable=False)
+    filename: Mapped[str] = mapped_column(String, nullable=False)
+    original_filename: Mapped[str] = mapped_column(String, nullable=False)
+    file_path: Mapped[str] = mapped_column(String, nullable=False)
+    file_size: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    content_type: Mapped[str] = mapped_column(String, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    updated_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), onupdate=func.now(), nullable=True)
+    # Мягкое удаление: файл и строка вычищаются фоновой задачей
+    deleted_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
@@ -1,5 +1,8 @@
-from sqlalchemy import Column, String, Boolean, Integer
+from datetime import datetime
+from typing import Optional
+from sqlalchemy import String, Boolean, Integer, DateTime, func
 from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.orm import Mapped, mapped_column
 from sqlalchemy.sql import expression
 import uuid
 
@@ -9,12 +12,17 @@ from app.db.session import Base  # Импорт из session.py
 class User(Base):
     __tablename__ = "users"
 
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    email = Column(String, unique=True, index=True, nullable=False)
-    name = Column(String, nullable=True)
-    yandex_id = Column(String, unique=True, nullable=False)
-    is_active = Column(Boolean, server_default=expression.true(), nullable=False)
-    is_superuser = Column(Boolean, server_default=expression.false(), nullable=False)
-    access_token = Column(String, nullable=True)
-    refresh_token = Column(String, nullable=True)
-    token_expires = Column(Integer, nullable=True)
\ No newline at end of file
+    id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    email: Mapped[str] = mapped_column(String, unique=True, index=True, nullable=False)
+    name: Mapped[Optional[str]] = mapped_column(String, nullable=True)
+    # Поиск пользователя при каждом логине через Яндекс (уникальный ix_users_yandex_id)
+    yandex_id: Mapped[str] = mapped_column(String, unique=True, index=True, nullable=False)
+    is_active: Mapped[bool] = mapped_column(Boolean, server_default=expression.true(), nullable=False)
+    is_superuser: Mapped[bool] = mapped_column(Boolean, server_default=expression.false(), nullable=False)
+    access_token: Mapped[Optional[str]] = mapped_column(String, nullable=True)
+    refresh_token: Mapped[Optional[str]] = mapped_column(String, nullable=True)
+    token_expires: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False
+    )
@@ -1,62 +1,155 @@
-from fastapi import APIRouter, Depends, UploadFile, File, HTTPException, status
-from fastapi.responses import FileResponse
+import uuid
+from typing import List, Optional
+from fastapi import APIRouter, BackgroundTasks, Depends, UploadFile, File, HTTPException, Query, status
+from fastapi.responses import FileResponse, ORJSONResponse, RedirectResponse
+from fastapi.concurrency import run_in_threadpool
 from pathlib import Path
-import os
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.schemas.audio import AudioFileInDB
 from app.services.audio import AudioService
-from app.routes.users import get_current_user
-from app.models.user import User
+from app.services.storage import s3_enabled
+from app.routes.users import get_current_user, AuthedUser
 from app.core.config import settings
 from app.db.session import get_async_session
 
 router = APIRouter(prefix="/audio", tags=["audio"])
 
+SIZE_CHECK_CHUNK = 1 << 20  # 1 MiB
+# Запас на boundary и заголовки multipart в Content-Length
+MULTIPART_OVERHEAD = 16 * 1024
+
+# Тексты ошибок не меняются за время жизни процесса
+_ALLOWED_TYPES_MSG = f"Unsupported file type. Allowed: {settings.audio.allowed_types_display}"
+_MAX_SIZE_MSG = f"File too large. Max size: {settings.audio.max_file_size} bytes"
+_MAX_BATCH_FILES_MSG = f"Too many files. Max per batch: {settings.audio.max_batch_files}"
+_MAX_BATCH_SIZE_MSG = f"Batch too large. Max total size: {settings.audio.max_batch_size} bytes"
+
+class UploadSizeLimitMiddleware:
+    """Отклоняет загрузку с заведомо большим Content-Length ещё до чтения тела.
+
+    Проверка в обработчике или в Depends опоздала бы: FastAPI разбирает
+    и spool'ит весь multipart до их вызова. Без Content-Length (chunked)
+    размер проверяется уже после разбора, в _check_upload.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        audio = settings.audio
+        # Сначала более длинный суффикс: /upload/batch тоже оканчивается на /upload
+        self.limits = (
+            ("/upload/batch", audio.max_batch_size + MULTIPART_OVERHEAD * audio.max_batch_files, _MAX_BATCH_SIZE_MSG),
+            ("/upload", audio.max_file_size + MULTIPART_OVERHEAD, _MAX_SIZE_MSG),
+        )
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["method"] == "POST":
+            path = scope["path"]
+            for suffix, limit, message in self.limits:
+                if path.startswith(router.prefix) and path.endswith(suffix):
+                    content_length = dict(scope["headers"]).get(b"content-length", b"")
+                    if content_length.isdigit() and int(content_length) > limit:
+                        response = ORJSONResponse(
+                            {"detail": message},
+                            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+                        )
+                        await response(scope, receive, send)
+                        return
+                    break
+        await self.app(scope, receive, send)
+
+async def _check_upload(file: UploadFile) -> int:
+    """Проверка типа и размера одного загружаемого файла, возвращает размер"""
+    # Проверка типа файла
+    if file.content_type not in settings.audio.allowed_types:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=_ALLOWED_TYPES_MSG
+        )
+    
+    # Размер уже посчитан Starlette, пока он писал части multipart в spool,
+    # поэтому файл повторно не читаем
+    if file.size is not None:
+        if file.size > settings.audio.max_file_size:
+            raise HTTPException(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                detail=_MAX_SIZE_MSG
+            )
+        return file.size
+
+    # Размер неизвестен: считаем потоково, прерываясь сразу при превышении лимита
+    file_size = 0
+    while chunk := await file.read(SIZE_CHECK_CHUNK):
+        file_size += len(chunk)
+        if file_size > settings.audio.max_file_size:
+            raise HTTPException(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                detail=_MAX_SIZE_MSG
+            )
+    await file.seek(0)
+    return file_size
+
 @router.post("/upload", response_model=AudioFileInDB, status_code=status.HTTP_201_CREATED)
 async def upload_audio_file(
     file: UploadFile = File(...),
-    current_user: User = Depends(get_current_user),
+    current_user: AuthedUser = Depends(get_current_user),
     session: AsyncSession = Depends(get_async_session)
 ):
     """Загрузка аудиофайла"""
-    # Проверка типа файла
-    if file.content_type not in settings.audio.allowed_types:
+    # Явно большой Content-Length уже отклонён в UploadSizeLimitMiddleware
+    await _check_upload(file)
+    
+    return await AudioService.save_audio_file(
+        user_id=current_user.id,
+        file=file,
+        session=session
+    )
+
+@router.post("/upload/batch", response_model=List[AudioFileInDB], status_code=status.HTTP_201_CREATED)
+async def upload_audio_files_batch(
+    files: List[UploadFile] = File(...),
+    current_user: AuthedUser = Depends(get_current_user),
+    session: AsyncSession = Depends(get_async_session)
+):
+    """Пакетная загрузка аудиофайлов"""
+    if len(files) > settings.audio.max_batch_files:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Unsupported file type. Allowed: {', '.join(settings.audio.allowed_types)}"
+            detail=_MAX_BATCH_FILES_MSG
         )
-    
-    # Проверка размера файла
-    file.file.seek(0, os.SEEK_END)
-    file_size = file.file.tell()
-    file.file.seek(0)
-    
-    if file_size > settings.audio.max_file_size:
+    total_size = 0
+    for file in files:
+        total_size += await _check_upload(file)
+    if total_size > settings.audio.max_batch_size:
         raise HTTPException(
             status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
-            detail=f"File too large. Max size: {settings.audio.max_file_size} bytes"
+            detail=_MAX_BATCH_SIZE_MSG
         )
     
-    return await AudioService.save_audio_file(
+    return await AudioService.save_audio_files_bulk(
         user_id=current_user.id,
-        file=file,
-        session=session,
-        storage_path=settings.audio.storage_path
+        files=files,
+        session=session
     )
 
 @router.get("/my", response_model=list[AudioFileInDB])
 async def get_my_audio_files(
-    current_user: User = Depends(get_current_user),
+    limit: int = Query(50, ge=1, le=500),
+    after_id: Optional[uuid.UUID] = None,
+    current_user: AuthedUser = Depends(get_current_user),
     session: AsyncSession = Depends(get_async_session)
 ):
-    """Получить список моих аудиофайлов"""
-    return await AudioService.get_user_audio_files(current_user.id, session)
+    """Получить страницу моих аудиофайлов, новые первыми (after_id - id последнего файла предыдущей страницы)"""
+    return [
+        f async for f in AudioService.get_user_audio_files(
+            current_user.id, session, limit=limit, after_id=after_id
+        )
+    ]
 
 @router.get("/download/{file_id}")
 async def download_audio_file(
     file_id: str,
-    current_user: User = Depends(get_current_user),
+    current_user: AuthedUser = Depends(get_current_user),
     session: AsyncSession = Depends(get_async_session)
 ):
     """Скачать аудиофайл"""
@@ -66,34 +159,46 @@ async def download_audio_file(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Audio file not found"
         )
+
+    if s3_enabled():
+        # Байты отдаёт само хранилище, а не API-нода
+        url = await AudioService.presign_download(audio_file)
+        return RedirectResponse(url, status_code=status.HTTP_307_TEMPORARY_REDIRECT)
     
     file_path = Path(audio_file.file_path)
-    if not file_path.exists():
+    # Один stat вне event loop: он же проверка существования и готовый
+    # stat_result для FileResponse (иначе Starlette делает свой os.stat)
+    try:
+        stat_result = await run_in_threadpool(file_path.stat)
+    except FileNotFoundError:
         raise HTTPException(
             status_code=status.HTTP_410_GONE,
             detail="File no longer exists on server"
         )
     
     return FileResponse(
-        file_path,
+        str(file_path),
         media_type=audio_file.content_type,
-        filename=audio_file.original_filename
+        filename=audio_file.original_filename,
+        stat_result=stat_result
     )
 
 @router.delete("/{file_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_audio_file(
     file_id: str,
-    current_user: User = Depends(get_current_user),
+    background_tasks: BackgroundTasks,
+    current_user: AuthedUser = Depends(get_current_user),
     session: AsyncSession = Depends(get_async_session)
 ):
     """Удалить аудиофайл"""
-    success = await AudioService.delete_audio_file(
+    file_path = await AudioService.delete_audio_file(
         file_id=file_id,
         user_id=current_user.id,
         session=session
     )
-    if not success:
+    if file_path is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Audio file not found or you don't have permission"
-        )
\ No newline at end of file
+        )
+    background_tasks.add_task(AudioService.purge_audio_file, file_id, file_path)
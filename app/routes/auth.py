@@ -7,9 +7,9 @@ import json
 from urllib.parse import urlencode, quote
 import logging
 
-from app.schemas.user import UserInDB, Token
+from app.schemas.user import UserInDBAdapter, Token
 from app.models.user import User
-from app.services.auth import AuthService, get_auth_service
+from app.services.auth import AuthService, get_auth_service, invalidate_yandex_info
 from app.core.config import Settings, get_settings
 
 router = APIRouter(prefix="/auth", tags=["auth"])
@@ -17,7 +17,7 @@ logger = logging.getLogger(__name__)
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/yandex")
 
-async def get_yandex_user_info(access_token: str) -> dict:
+async def get_yandex_user_info(request: Request, access_token: str) -> dict:
     """Get user info from Yandex API with proper encoding"""
     try:
         headers = {
@@ -25,30 +25,32 @@ async def get_yandex_user_info(access_token: str) -> dict:
             "Accept": "application/json"
         }
 
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                "https://login.yandex.ru/info",
-                headers=headers,
-                params={"format": "json"},
-                timeout=10.0
-            )
+        client: httpx.AsyncClient = request.app.state.http
+        response = await client.get(
+            "https://login.yandex.ru/info",
+            headers=headers,
+            params={"format": "json"},
+            timeout=10.0
+        )
 
-            if response.status_code != 200:
-                error_msg = f"Yandex API error: {response.status_code}"
-                try:
-                    error_data = response.json()
-                    error_msg = error_data.get("error_description", error_msg)
-                except json.JSONDecodeError:
-                    error_msg = response.text[:200]
-                raise HTTPException(
-                    status_code=status.HTTP_401_UNAUTHORIZED,
-                    detail=error_msg
-                )
-                
-            return response.json()
+        if response.status_code != 200:
+            if response.status_code == status.HTTP_401_UNAUTHORIZED:
+                invalidate_yandex_info(access_token)
+            error_msg = f"Yandex API error: {response.status_code}"
+            try:
+                error_data = response.json()
+                error_msg = error_data.get("error_description", error_msg)
+            except json.JSONDecodeError:
+                error_msg = response.text[:200]
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail=error_msg
+            )
+            
+        return response.json()
             
     except httpx.RequestError as e:
-        logger.error(f"Request to Yandex API failed: {str(e)}")
+        logger.error("Request to Yandex API failed: %s", e)
         raise HTTPException(
             status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
             detail="Yandex service unavailable"
@@ -75,7 +77,7 @@ async def auth_via_yandex_token(
                 detail="Yandex access token is required"
             )
 
-        user_data = await get_yandex_user_info(yandex_token)
+        user_data = await get_yandex_user_info(request, yandex_token)
         
         if not user_data.get("id"):
             raise HTTPException(
@@ -92,7 +94,7 @@ async def auth_via_yandex_token(
         return Token(
             access_token=auth_service.create_access_token(data={"sub": str(user.id)}),
             token_type="bearer",
-            user=UserInDB.from_orm(user)
+            user=UserInDBAdapter.validate_python(user, from_attributes=True)
         )
             
     except json.JSONDecodeError:
@@ -103,7 +105,7 @@ async def auth_via_yandex_token(
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Authentication error: {str(e)}", exc_info=True)
+        logger.error("Authentication error: %s", e, exc_info=True)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Authentication failed"
@@ -123,12 +125,13 @@ async def login_via_yandex(settings: Settings = Depends(get_settings)):
     
     auth_url = f"{yandex_settings.AUTH_URL}?{urlencode(params)}"
     
-    logger.debug(f"Yandex OAuth redirect URL: {auth_url}")
+    logger.debug("Yandex OAuth redirect URL: %s", auth_url)
     
     return RedirectResponse(auth_url)
 
 @router.get("/yandex/callback")
 async def yandex_callback(
+    request: Request,
     code: str = Query(...),
     error: Optional[str] = Query(None),
     error_description: Optional[str] = Query(None),
@@ -150,43 +153,43 @@ async def yandex_callback(
                 detail="Authorization code is required"
             )
 
-        logger.debug(f"Exchanging code, client_id: {settings.yandex.YANDEX_CLIENT_ID}, "
-                   f"redirect_uri: {settings.yandex.YANDEX_REDIRECT_URI}")
+        logger.debug("Exchanging code, client_id: %s, redirect_uri: %s",
+                     settings.yandex.YANDEX_CLIENT_ID, settings.yandex.YANDEX_REDIRECT_URI)
 
         # Exchange code for token
-        async with httpx.AsyncClient() as client:
-            token_response = await client.post(
-                "https://oauth.yandex.ru/token",
-                data={
-                    "grant_type": "authorization_code",
-                    "code": code,
-                    "client_id": settings.yandex.YANDEX_CLIENT_ID,
-                    "client_secret": settings.yandex.YANDEX_CLIENT_SECRET.get_secret_value(),
-                    "redirect_uri": settings.yandex.YANDEX_REDIRECT_URI
-                },
-                headers={"Content-Type": "application/x-www-form-urlencoded"},
-                timeout=10.0
+        client: httpx.AsyncClient = request.app.state.http
+        token_response = await client.post(
+            "https://oauth.yandex.ru/token",
+            data={
+                "grant_type": "authorization_code",
+                "code": code,
+                "client_id": settings.yandex.YANDEX_CLIENT_ID,
+                "client_secret": settings.yandex.YANDEX_CLIENT_SECRET.get_secret_value(),
+                "redirect_uri": settings.yandex.YANDEX_REDIRECT_URI
+            },
+            headers={"Content-Type": "application/x-www-form-urlencoded"},
+            timeout=10.0
+        )
+        
+        if token_response.status_code != 200:
+            error_detail = "Failed to exchange code for token"
+            try:
+                error_data = token_response.json()
+                error_detail = error_data.get("error_description", error_detail)
+                logger.error("Token exchange failed: %s", error_detail)
+            except json.JSONDecodeError:
+                logger.error("Token exchange failed with status %s: %s", token_response.status_code, token_response.text)
+            
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail=error_detail
             )
             
-            if token_response.status_code != 200:
-                error_detail = "Failed to exchange code for token"
-                try:
-                    error_data = token_response.json()
-                    error_detail = error_data.get("error_description", error_detail)
-                    logger.error(f"Token exchange failed: {error_detail}")
-                except json.JSONDecodeError:
-                    logger.error(f"Token exchange failed with status {token_response.status_code}: {token_response.text}")
-                
-                raise HTTPException(
-                    status_code=status.HTTP_401_UNAUTHORIZED,
-                    detail=error_detail
-                )
-                
-            token_data = token_response.json()
-            logger.debug("Successfully received token from Yandex")
+        token_data = token_response.json()
+        logger.debug("Successfully received token from Yandex")
 
         # Get user info
-        user_data = await get_yandex_user_info(token_data["access_token"])
+        user_data = await get_yandex_user_info(request, token_data["access_token"])
         if not user_data.get("id"):
             logger.error("Invalid user data received from Yandex")
             raise HTTPException(
@@ -200,7 +203,7 @@ async def yandex_callback(
             "email": user_data.get("default_email", ""),
             "access_token": token_data["access_token"]
         })
-        logger.info(f"Authenticated user: {user.id}")
+        logger.info("Authenticated user: %s", user.id)
 
         # Create JWT token
         token = auth_service.create_access_token(data={"sub": str(user.id)})
@@ -213,10 +216,10 @@ async def yandex_callback(
         return RedirectResponse(url=frontend_redirect_url)
         
     except HTTPException as he:
-        logger.error(f"Callback error: {he.detail}", exc_info=True)
+        logger.error("Callback error: %s", he.detail, exc_info=True)
         raise
     except Exception as e:
-        logger.error(f"Unexpected callback error: {str(e)}", exc_info=True)
+        logger.error("Unexpected callback error: %s", e, exc_info=True)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Internal server error during OAuth processing"
@@ -1,42 +1,81 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from typing import List
+from typing import List, NamedTuple
+import uuid
 
 from app.schemas.user import UserInDB, UserUpdate
 from app.services.auth import AuthService
 from app.models.user import User
+from sqlalchemy import update
 from sqlalchemy.future import select
-from app.db.session import async_session_maker as AsyncSessionLocal
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db.session import get_async_session
 
 router = APIRouter()
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/yandex")
 
-async def get_current_user(token: str = Depends(oauth2_scheme)) -> User:
-    credentials_exception = HTTPException(
+class AuthedUser(NamedTuple):
+    """Минимум данных о пользователе для авторизации запроса"""
+    id: uuid.UUID
+    is_active: bool
+    is_superuser: bool
+
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    
-    payload = await AuthService.verify_token(token)
+
+def _get_token_subject(token: str) -> uuid.UUID:
+    payload = AuthService.verify_token(token)
     if not payload:
-        raise credentials_exception
+        raise _credentials_exception()
     
     user_id = payload.get("sub")
     if not user_id:
-        raise credentials_exception
+        raise _credentials_exception()
+    
+    # Приводим к UUID один раз, чтобы в запрос уходил типизированный параметр
+    try:
+        return uuid.UUID(user_id)
+    except ValueError:
+        raise _credentials_exception()
+
+async def get_current_user(
+    token: str = Depends(oauth2_scheme),
+    session: AsyncSession = Depends(get_async_session)
+) -> AuthedUser:
+    user_id = _get_token_subject(token)
     
-    async with AsyncSessionLocal() as session:
-        result = await session.execute(select(User).where(User.id == user_id))
-        user = result.scalars().first()
-        
-        if user is None:
-            raise credentials_exception
-        
-        return user
+    # Только нужные для авторизации колонки, без сборки ORM-объекта
+    result = await session.execute(
+        select(User.id, User.is_active, User.is_superuser).where(User.id == user_id)
+    )
+    row = result.one_or_none()
+    
+    if row is None:
+        raise _credentials_exception()
+    
+    return AuthedUser(*row)
 
-async def get_current_superuser(current_user: User = Depends(get_current_user)) -> User:
+async def get_full_user(
+    token: str = Depends(oauth2_scheme),
+    session: AsyncSession = Depends(get_async_session)
+) -> User:
+    """Полная ORM-сущность - для эндпоинтов, которые отдают/меняют профиль"""
+    user_id = _get_token_subject(token)
+    
+    # Поиск по первичному ключу: сначала identity map, затем PK SELECT
+    user = await session.get(User, user_id)
+    
+    if user is None:
+        raise _credentials_exception()
+    
+    return user
+
+async def get_current_superuser(current_user: AuthedUser = Depends(get_current_user)) -> AuthedUser:
     if not current_user.is_superuser:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -45,50 +84,51 @@ async def get_current_superuser(current_user: User = Depends(get_current_user))
     return current_user
 
 @router.get("/me", response_model=UserInDB)
-async def read_user_me(current_user: User = Depends(get_current_user)):
+async def read_user_me(current_user: User = Depends(get_full_user)):
     return current_user
 
 @router.put("/me", response_model=UserInDB)
 async def update_user_me(
     user_update: UserUpdate,
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_full_user),
+    session: AsyncSession = Depends(get_async_session)
 ):
-    async with AsyncSessionLocal() as session:
-        for var, value in vars(user_update).items():
-            if value is not None:
-                setattr(current_user, var, value)
-        
-        session.add(current_user)
+    # Один UPDATE вместо setattr по каждому полю и flush
+    fields = user_update.model_dump(exclude_unset=True, exclude_none=True)
+    if fields:
+        await session.execute(
+            update(User).where(User.id == current_user.id).values(**fields)
+        )
         await session.commit()
+        # Подтягиваем updated_at и прочие серверные значения
         await session.refresh(current_user)
-        return current_user
+    return current_user
 
 @router.get("/", response_model=List[UserInDB])
 async def read_users(
     skip: int = 0,
     limit: int = 100,
-    current_user: User = Depends(get_current_superuser)
+    current_user: AuthedUser = Depends(get_current_superuser),
+    session: AsyncSession = Depends(get_async_session)
 ):
-    async with AsyncSessionLocal() as session:
-        result = await session.execute(select(User).offset(skip).limit(limit))
-        users = result.scalars().all()
-        return users
+    result = await session.execute(select(User).offset(skip).limit(limit))
+    # ORM-строки как есть: response_model проверит их один раз (from_attributes)
+    return result.scalars().all()
 
 @router.delete("/{user_id}")
 async def delete_user(
-    user_id: str,
-    current_user: User = Depends(get_current_superuser)
+    user_id: uuid.UUID,
+    current_user: AuthedUser = Depends(get_current_superuser),
+    session: AsyncSession = Depends(get_async_session)
 ):
-    async with AsyncSessionLocal() as session:
-        result = await session.execute(select(User).where(User.id == user_id))
-        user = result.scalars().first()
-        
-        if not user:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="User not found"
-            )
-        
-        await session.delete(user)
-        await session.commit()
-        return {"ok": True}
\ No newline at end of file
+    user = await session.get(User, user_id)
+    
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="User not found"
+        )
+    
+    await session.delete(user)
+    await session.commit()
+    return {"ok": True}
@@ -1,12 +1,12 @@
-from fastapi import APIRouter, HTTPException
-import requests
+from fastapi import APIRouter, HTTPException, Request
+import httpx
 from fastapi.responses import JSONResponse
 from app.core.config import settings
 
 yandex_router = APIRouter()
 
 @yandex_router.get("/callback")
-async def yandex_callback(code: str, client_id: str, client_secret: str):
+async def yandex_callback(request: Request, code: str, client_id: str, client_secret: str):
     """
     Обработка callback от Yandex для получения токена.
     """
@@ -18,8 +18,14 @@ async def yandex_callback(code: str, client_id: str, client_secret: str):
         "grant_type": "authorization_code",
     }
     try:
-        response = requests.post(token_url, data=data)
-        response.raise_for_status()
-        return JSONResponse(content=response.json())
-    except requests.exceptions.RequestException as e:
-        raise HTTPException(status_code=400, detail=f"Yandex OAuth error: {e}")
+        client: httpx.AsyncClient = request.app.state.http
+        response = await client.post(token_url, data=data)
+    except httpx.RequestError as e:
+        raise HTTPException(status_code=503, detail=f"Yandex OAuth unavailable: {e}")
+
+    if response.status_code >= 400:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Yandex OAuth error: {response.status_code} {response.text[:200]}"
+        )
+    return JSONResponse(content=response.json())
@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
 from datetime import datetime
 from typing import Optional
 from uuid import UUID
@@ -18,6 +18,9 @@ class AudioFileInDB(AudioFileBase):
     created_at: datetime
     updated_at: Optional[datetime]
 
-
-    class Config:
-        from_attributes = True  # <-- Добавьте это
\ No newline at end of file
+    model_config = ConfigDict(
+        from_attributes=True,
+        # Готовые экземпляры не перепроверяются и не копируются
+        revalidate_instances="never",
+        validate_assignment=False,
+    )
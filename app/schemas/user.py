@@ -1,5 +1,5 @@
-from pydantic import BaseModel, EmailStr, Field
-from typing import Optional
+from pydantic import BaseModel, ConfigDict, EmailStr, Field, TypeAdapter
+from typing import Optional, List
 import uuid
 from datetime import datetime
 
@@ -46,9 +46,12 @@ class UserInDB(UserBase):
     created_at: datetime
     updated_at: datetime
 
-    class Config:
-        from_attributes = True  # Ранее known_as orm_mode
-        json_schema_extra = {
+    model_config = ConfigDict(
+        from_attributes=True,  # Ранее known_as orm_mode
+        # Готовые экземпляры не перепроверяются и не копируются
+        revalidate_instances="never",
+        validate_assignment=False,
+        json_schema_extra={
             "example": {
                 "id": "a1b2c3d4-e5f6-7890-g1h2-i3j4k5l6m7n8",
                 "email": "user@example.com",
@@ -59,6 +62,10 @@ class UserInDB(UserBase):
                 "updated_at": "2023-01-01T00:00:00"
             }
         }
+    )
 
 # Для циклических ссылок (если нужно)
-Token.update_forward_refs()
\ No newline at end of file
+Token.model_rebuild()
+
+# Адаптеры строятся один раз на модуль, а не на каждый вызов
+UserInDBAdapter = TypeAdapter(UserInDB)
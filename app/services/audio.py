@@ -1,16 +1,202 @@
 from app.models.audio import AudioFile
 from app.schemas.audio import AudioFileCreate, AudioFileInDB
 from sqlalchemy.ext.asyncio import AsyncSession
-from uuid import uuid4
+from uuid import UUID, uuid4
+import asyncio
+import logging
 import os
+import sys
+import aiofiles
 from pathlib import Path
-from datetime import datetime
-from typing import List, Optional
-from sqlalchemy import select
+from urllib.parse import quote
+from datetime import datetime, timedelta
+from typing import AsyncIterator, List, Optional
+from sqlalchemy import select, insert, delete, update, func, tuple_
+from sqlalchemy.orm import aliased
 from fastapi import UploadFile
 from app.core.config import settings
+from app.db.session import async_session_maker
+from app.services.storage import get_s3, s3_enabled
+
+logger = logging.getLogger(__name__)
+
+UPLOAD_CHUNK = 1 << 20  # 1 MiB
+
+# Пакетная загрузка: сколько файлов пишется на диск одновременно
+BULK_WRITE_CONCURRENCY = 8
+# С этого числа строк метаданные вставляются через COPY, ниже - executemany
+BULK_COPY_THRESHOLD = 100
+# Сколько помеченных удалёнными строк дочищается за один проход
+PURGE_BATCH = 500
+_BULK_COLUMNS = ["id", "user_id", "filename", "original_filename", "file_path", "file_size", "content_type"]
+
+# Порция для sendfile при копировании в ядре
+KERNEL_COPY_CHUNK = 1 << 24  # 16 MiB
+_HAS_KERNEL_COPY = sys.platform.startswith("linux") and hasattr(os, "sendfile")
+
+# Подкаталоги по первым двум hex-символам UUID: в каждом ~1/256 файлов
+UPLOAD_SHARDS = [f"{i:02x}" for i in range(256)]
+
+def ensure_upload_dirs() -> None:
+    """Создаёт каталог загрузок и все шарды (идемпотентно, при старте)"""
+    root = Path(settings.audio.upload_dir)
+    for shard in UPLOAD_SHARDS:
+        (root / shard).mkdir(parents=True, exist_ok=True)
+
+_upload_semaphore: Optional[asyncio.Semaphore] = None
+
+def _get_upload_semaphore() -> asyncio.Semaphore:
+    # Создаётся при первом обращении, уже внутри event loop приложения
+    # (на Python 3.9 семафор привязывается к loop в момент создания)
+    global _upload_semaphore
+    if _upload_semaphore is None:
+        _upload_semaphore = asyncio.Semaphore(settings.audio.max_concurrent_uploads)
+    return _upload_semaphore
+
+def _rolled_to_disk(file: UploadFile) -> bool:
+    # Та же проверка, что делает сам Starlette для SpooledTemporaryFile:
+    # неизвестный объект читаем в потоке, на случай если он всё-таки на диске
+    return getattr(file.file, "_rolled", True)
+
+def _can_kernel_copy(file: UploadFile) -> bool:
+    # Только если spool точно уже лежит на диске (здесь по умолчанию False):
+    # fileno() у spool в памяти сам сбросил бы его на диск, а у BytesIO
+    # и прочих объектов без дескриптора его нет вовсе
+    if not (settings.audio.kernel_copy_uploads and _HAS_KERNEL_COPY
+            and getattr(file.file, "_rolled", False)):
+        return False
+    try:
+        file.file.fileno()
+    except (AttributeError, OSError, ValueError):
+        return False
+    return True
+
+def _readinto(f, buffer) -> int:
+    # SpooledTemporaryFile получил readinto только в Python 3.11
+    readinto = getattr(f, "readinto", None) or f._file.readinto
+    return readinto(buffer)
+
+def _kernel_copy(src_fd: int, dst_path: Path) -> int:
+    """Копирует файл целиком в ядре (sendfile), без буферов в userspace"""
+    copied = 0
+    with open(dst_path, "wb") as out:
+        out_fd = out.fileno()
+        while sent := os.sendfile(out_fd, src_fd, copied, KERNEL_COPY_CHUNK):
+            copied += sent
+    return copied
+
+class _CountingReader:
+    """Асинхронный read() поверх UploadFile для upload_fileobj, считает отданные байты.
+
+    aioboto3 дожидается read(), если тот возвращает awaitable, а UploadFile.read
+    читает spool с диска в потоке - event loop не блокируется.
+    """
+
+    def __init__(self, file: UploadFile):
+        self.file = file
+        self.size = 0
+
+    async def read(self, size: int = -1) -> bytes:
+        chunk = await self.file.read(size)
+        self.size += len(chunk)
+        return chunk
+
+def _content_disposition(filename: str) -> str:
+    """attachment с RFC 5987 filename* (как у FileResponse) и ASCII-запасным filename"""
+    fallback = "".join(
+        c if c.isascii() and c.isprintable() and c not in '"\\' else "_" for c in filename
+    )
+    return f"attachment; filename=\"{fallback}\"; filename*=UTF-8''{quote(filename, safe='')}"
 
 class AudioService:
+    @staticmethod
+    async def _remove_stored(file_path: str) -> None:
+        """Удаляет байты файла из хранилища (диск или S3); отсутствующий файл - не ошибка"""
+        if s3_enabled():
+            await get_s3().delete_object(Bucket=settings.audio.s3_bucket, Key=file_path)
+            return
+        try:
+            await asyncio.to_thread(os.unlink, file_path)
+        except FileNotFoundError:
+            pass
+
+    @staticmethod
+    async def _discard_stored(file_paths: List[str]) -> None:
+        """Откат уже записанных файлов, для которых не будет строки в БД"""
+        results = await asyncio.gather(
+            *(AudioService._remove_stored(p) for p in file_paths), return_exceptions=True
+        )
+        for file_path, result in zip(file_paths, results):
+            if isinstance(result, Exception):
+                logger.warning("Error discarding orphaned file %s: %s", file_path, result)
+
+    @staticmethod
+    async def _write_upload(file: UploadFile, user_id: str) -> tuple[str, str, int]:
+        """Сохраняет загруженный файл, возвращает (имя, путь или ключ S3, размер)"""
+        # Генерация уникального имени файла
+        file_ext = os.path.splitext(file.filename)[1]
+        uid = uuid4().hex
+        filename = f"{uid}{file_ext}"
+        if s3_enabled():
+            key, file_size = await AudioService._upload_to_s3(file, f"{user_id}/{filename}")
+            return filename, key, file_size
+
+        # Шард-каталог уже создан при старте приложения (ensure_upload_dirs)
+        file_path = Path(settings.audio.upload_dir) / uid[:2] / filename
+        
+        # Сохранение файла потоково, кусками по UPLOAD_CHUNK:
+        # память O(chunk), event loop не блокируется на записи.
+        # Семафор ограничивает число одновременных записей на диск;
+        # коммит в БД делается уже вне его
+        file_size = 0
+        async with _get_upload_semaphore():
+            if _can_kernel_copy(file):
+                # Один переход в поток на файл вместо двух на каждый chunk
+                file_size = await asyncio.to_thread(_kernel_copy, file.file.fileno(), file_path)
+            else:
+                # Один буфер на всю загрузку вместо нового bytes на каждый chunk
+                buffer = bytearray(UPLOAD_CHUNK)
+                view = memoryview(buffer)
+                on_disk = _rolled_to_disk(file)
+                async with aiofiles.open(file_path, "wb") as out:
+                    while True:
+                        if on_disk:
+                            n = await asyncio.to_thread(_readinto, file.file, view)
+                        else:
+                            n = _readinto(file.file, view)
+                        if not n:
+                            break
+                        await out.write(view[:n])
+                        file_size += n
+        return filename, str(file_path), file_size
+
+    @staticmethod
+    async def _upload_to_s3(file: UploadFile, key: str) -> tuple[str, int]:
+        """Загружает файл в S3 потоком; multipart и его параллельность - на стороне SDK"""
+        reader = _CountingReader(file)
+        async with _get_upload_semaphore():
+            await get_s3().upload_fileobj(
+                reader,
+                settings.audio.s3_bucket,
+                key,
+                ExtraArgs={"ContentType": file.content_type},
+            )
+        return key, reader.size
+
+    @staticmethod
+    async def presign_download(audio_file: AudioFileInDB) -> str:
+        """Временная ссылка на скачивание файла прямо из S3"""
+        return await get_s3().generate_presigned_url(
+            "get_object",
+            Params={
+                "Bucket": settings.audio.s3_bucket,
+                "Key": audio_file.file_path,
+                "ResponseContentType": audio_file.content_type,
+                "ResponseContentDisposition": _content_disposition(audio_file.original_filename),
+            },
+            ExpiresIn=settings.audio.s3_presign_ttl,
+        )
+
     @staticmethod
     async def save_audio_file(
         user_id: str,
@@ -19,27 +205,14 @@ class AudioService:
     ) -> AudioFileInDB:
         """Сохраняет аудиофайл на сервере и в базе данных"""
         try:
-            # Генерация уникального имени файла
-            file_ext = os.path.splitext(file.filename)[1]
-            filename = f"{uuid4()}{file_ext}"
-            file_path = Path(settings.AUDIO_UPLOAD_DIR) / filename
-            
-            # Создание директории, если не существует
-            file_path.parent.mkdir(exist_ok=True, parents=True)
-            
-            # Сохранение файла
-            with open(file_path, "wb") as buffer:
-                content = await file.read()
-                buffer.write(content)
-            
-            # Получение размера файла
-            file_size = os.path.getsize(file_path)
+            filename, file_path, file_size = await AudioService._write_upload(file, user_id)
             
             # Сохранение в БД
             audio_file = AudioFile(
                 user_id=user_id,
+                filename=filename,
                 original_filename=file.filename,
-                file_path=str(file_path),
+                file_path=file_path,
                 file_size=file_size,
                 content_type=file.content_type
             )
@@ -48,20 +221,94 @@ class AudioService:
             await session.commit()
             await session.refresh(audio_file)
             
-            return AudioFileInDB.from_orm(audio_file)
+            return AudioFileInDB.model_validate(audio_file)
         finally:
             await file.close()
 
     @staticmethod
-    async def get_user_audio_files(
+    async def save_audio_files_bulk(
         user_id: str,
+        files: List[UploadFile],
         session: AsyncSession
     ) -> List[AudioFileInDB]:
-        """Получает список аудиофайлов пользователя"""
-        result = await session.execute(
-            select(AudioFile).where(AudioFile.user_id == user_id)
+        """Сохраняет пачку файлов: диск - параллельно, БД - одной вставкой и одним коммитом"""
+        semaphore = asyncio.Semaphore(BULK_WRITE_CONCURRENCY)
+
+        async def store(file: UploadFile):
+            async with semaphore:
+                try:
+                    return await AudioService._write_upload(file, user_id)
+                finally:
+                    await file.close()
+
+        # return_exceptions: дожидаемся всех записей, чтобы при ошибке
+        # откатить и те файлы, что успели записаться
+        written = await asyncio.gather(*(store(f) for f in files), return_exceptions=True)
+        stored = [w[1] for w in written if not isinstance(w, BaseException)]
+        failed = next((w for w in written if isinstance(w, BaseException)), None)
+        if failed is not None:
+            await AudioService._discard_stored(stored)
+            raise failed
+
+        rows = [
+            (uuid4(), user_id, filename, file.filename, file_path, file_size, file.content_type)
+            for file, (filename, file_path, file_size) in zip(files, written)
+        ]
+
+        try:
+            if len(rows) >= BULK_COPY_THRESHOLD:
+                # COPY через asyncpg в той же транзакции, что и сессия
+                connection = await session.connection()
+                raw_connection = await connection.get_raw_connection()
+                await raw_connection.driver_connection.copy_records_to_table(
+                    AudioFile.__tablename__, records=rows, columns=_BULK_COLUMNS
+                )
+            else:
+                await session.execute(
+                    insert(AudioFile), [dict(zip(_BULK_COLUMNS, row)) for row in rows]
+                )
+            await session.commit()
+        except BaseException:
+            await session.rollback()
+            await AudioService._discard_stored(stored)
+            raise
+
+        # created_at проставляет БД, поэтому читаем строки обратно одним запросом
+        ids = [row[0] for row in rows]
+        result = await session.execute(select(AudioFile).where(AudioFile.id.in_(ids)))
+        by_id = {f.id: f for f in result.scalars().all()}
+        return [AudioFileInDB.model_validate(by_id[file_id]) for file_id in ids]
+
+    @staticmethod
+    async def get_user_audio_files(
+        user_id: str,
+        session: AsyncSession,
+        *,
+        limit: int = 50,
+        after_id: Optional[UUID] = None
+    ) -> AsyncIterator[AudioFileInDB]:
+        """Отдаёт страницу аудиофайлов пользователя по мере чтения строк.
+
+        Сначала новые: keyset-пагинация по (created_at, id), индекс
+        ix_audio_user_created. Следующая страница запрашивается с
+        after_id = id последнего файла предыдущей.
+        """
+        key = tuple_(AudioFile.created_at, AudioFile.id)
+        stmt = (
+            select(AudioFile)
+            .where(AudioFile.user_id == user_id)
+            .where(AudioFile.deleted_at.is_(None))
+            .order_by(AudioFile.created_at.desc(), AudioFile.id.desc())
+            .limit(limit)
         )
-        return [AudioFileInDB.from_orm(f) for f in result.scalars().all()]
+        if after_id:
+            # Позиция курсора берётся из самой строки after_id (того же пользователя)
+            cursor = aliased(AudioFile)
+            stmt = stmt.join(
+                cursor, (cursor.id == after_id) & (cursor.user_id == user_id)
+            ).where(key < tuple_(cursor.created_at, cursor.id))
+        async for row in await session.stream_scalars(stmt):
+            yield AudioFileInDB.model_validate(row)
 
     @staticmethod
     async def get_audio_file(
@@ -74,32 +321,76 @@ class AudioService:
             select(AudioFile)
             .where(AudioFile.id == file_id)
             .where(AudioFile.user_id == user_id)
+            .where(AudioFile.deleted_at.is_(None))
         )
         file = result.scalar_one_or_none()
-        return AudioFileInDB.from_orm(file) if file else None
+        return AudioFileInDB.model_validate(file) if file else None
 
     @staticmethod
     async def delete_audio_file(
         file_id: str,
         user_id: str,
         session: AsyncSession
-    ) -> bool:
-        """Удаляет аудиофайл и его запись из БД"""
+    ) -> Optional[str]:
+        """Помечает аудиофайл удалённым, возвращает путь к файлу для purge_audio_file"""
+        # Один UPDATE ... RETURNING; файл и строку удаляет фоновая задача
         result = await session.execute(
-            select(AudioFile)
+            update(AudioFile)
             .where(AudioFile.id == file_id)
             .where(AudioFile.user_id == user_id)
+            .where(AudioFile.deleted_at.is_(None))
+            .values(deleted_at=func.now())
+            .returning(AudioFile.file_path)
         )
-        file = result.scalar_one_or_none()
-        
-        if file:
-            try:
-                os.unlink(file.file_path)
-            except OSError as e:
-                print(f"Error deleting file: {e}")
-            
-            await session.delete(file)
+        row = result.first()
+        await session.commit()
+        return row.file_path if row else None
+
+    @staticmethod
+    async def purge_audio_file(file_id: str, file_path: str) -> None:
+        """Удаляет файл (диск или S3) и строку из БД (фоновая задача после delete_audio_file)"""
+        try:
+            await AudioService._remove_stored(file_path)
+        except Exception as e:
+            # Строку оставляем помеченной: её дочистит purge_deleted_files
+            logger.warning("Error purging audio file %s (%s): %s", file_id, file_path, e)
+            return
+
+        # Запрос уже отвечен, поэтому своя сессия, а не из Depends
+        async with async_session_maker() as session:
+            await session.execute(
+                delete(AudioFile)
+                .where(AudioFile.id == file_id)
+                .where(AudioFile.deleted_at.is_not(None))
+            )
             await session.commit()
-            return True
-        
-        return False
\ No newline at end of file
+
+    @staticmethod
+    async def purge_deleted_files(limit: int = PURGE_BATCH) -> int:
+        """Дочищает помеченные удалёнными файлы, чья фоновая задача не отработала.
+
+        Берёт строки старше purge_grace (свежие ещё может обрабатывать
+        BackgroundTasks) - после ошибки хранилища или падения воркера.
+        Повторный purge безопасен, поэтому воркеры могут делать это параллельно.
+        """
+        async with async_session_maker() as session:
+            result = await session.execute(
+                select(AudioFile.id, AudioFile.file_path)
+                .where(AudioFile.deleted_at < func.now() - timedelta(seconds=settings.audio.purge_grace))
+                .limit(limit)
+            )
+            rows = result.all()
+        for row in rows:
+            await AudioService.purge_audio_file(row.id, row.file_path)
+        return len(rows)
+
+async def run_purge_sweeper() -> None:
+    """Периодический purge_deleted_files: при старте и затем раз в purge_interval"""
+    while True:
+        try:
+            purged = await AudioService.purge_deleted_files()
+            if purged:
+                logger.info("Purged %s soft-deleted audio files", purged)
+        except Exception as e:
+            logger.warning("Soft-deleted audio purge failed: %s", e)
+        await asyncio.sleep(settings.audio.purge_interval)
@@ -1,7 +1,11 @@
+import asyncio
+import hashlib
+import time
 import httpx
-from fastapi import HTTPException, status
-from jose import jwt, JWTError
-from datetime import datetime, timedelta
+from cachetools import TLRUCache, TTLCache
+from fastapi import HTTPException, Request, status
+import jwt
+from jwt.exceptions import ExpiredSignatureError, InvalidTokenError, MissingRequiredClaimError, PyJWTError
 from typing import Optional, Dict, Any, Union
 from pydantic import ValidationError
 
@@ -12,50 +16,99 @@ from app.db.session import AsyncSession, async_session_maker
 from sqlalchemy.future import select
 from sqlalchemy.exc import SQLAlchemyError, IntegrityError
 
+# Кэш проверенных JWT: повторные запросы с тем же токеном не пересчитывают подпись
+_jwt_cache: TTLCache = TTLCache(maxsize=10_000, ttl=60)
+
+YANDEX_INFO_TTL = 300
+
+def _yandex_info_ttu(_key, value, now):
+    # Запись не живёт дольше самого токена Яндекса (expires_in из tokeninfo)
+    expires_in = value.get("expires_in")
+    try:
+        ttl = min(YANDEX_INFO_TTL, int(expires_in))
+    except (TypeError, ValueError):
+        ttl = YANDEX_INFO_TTL
+    return now + ttl
+
+# Кэш ответов tokeninfo + login.yandex.ru/info; ключ - sha256 токена,
+# чтобы сами токены в памяти не хранились
+_yandex_info_cache: TLRUCache = TLRUCache(maxsize=10_000, ttu=_yandex_info_ttu)
+
+def _yandex_cache_key(access_token: str) -> str:
+    return hashlib.sha256(access_token.encode()).hexdigest()
+
+def invalidate_yandex_info(access_token: str) -> None:
+    """Сбрасывает кэш данных Яндекса по токену (Яндекс ответил на него 401)"""
+    _yandex_info_cache.pop(_yandex_cache_key(access_token), None)
+
+# Ключ и алгоритм JWT читаются из настроек один раз при импорте
+_SECRET = settings.auth.secret_key.get_secret_value()
+_ALG = settings.auth.algorithm
+# Сроки в секундах: exp и token_expires считаются как int(time.time()) + TTL
+_ACCESS_TTL = settings.auth.access_token_expire_minutes * 60
+_YANDEX_TTL = 30 * 24 * 60 * 60
+_DECODE_OPTS = {"require": ["exp", "sub"]}
+
+# Если до истечения сохранённого token_expires меньше этого, продлеваем его
+TOKEN_REFRESH_SKEW = 24 * 60 * 60
+
 class AuthService:
-    def __init__(self, session: AsyncSession):
+    def __init__(self, session: AsyncSession, http_client: httpx.AsyncClient):
         self.session = session
+        # Общий пул соединений приложения (app.state.http): keep-alive к *.yandex.ru
+        self.http_client = http_client
 
     async def get_yandex_user_info(self, access_token: str) -> Dict[str, Any]:
         """Получение и валидация информации о пользователе из Yandex OAuth"""
-        async with httpx.AsyncClient() as client:
-            try:
-                # Проверка валидности токена и получение scope
-                token_response = await client.get(
+        cache_key = _yandex_cache_key(access_token)
+        cached = _yandex_info_cache.get(cache_key)
+        if cached is not None:
+            return {**cached, "access_token": access_token}
+
+        client = self.http_client
+        try:
+            # Запросы независимы, поэтому идут параллельно:
+            # проверка токена/scope и данные пользователя
+            token_response, user_response = await asyncio.gather(
+                client.get(
                     "https://oauth.yandex.ru/tokeninfo",
                     params={"access_token": access_token},
                     timeout=10.0
-                )
-                token_response.raise_for_status()
-                token_data = token_response.json()
-
-                # Получение данных пользователя
-                user_response = await client.get(
+                ),
+                client.get(
                     "https://login.yandex.ru/info",
                     headers={"Authorization": f"OAuth {access_token}"},
                     params={"format": "json", "with_openid_identity": "true"},
                     timeout=10.0
                 )
-                user_response.raise_for_status()
-                user_data = user_response.json()
-
-                return {
-                    **token_data,
-                    **user_data,
-                    "access_token": access_token
-                }
-
-            except httpx.HTTPStatusError as exc:
-                error_detail = f"Yandex API error: {exc.response.text}"
-                raise HTTPException(
-                    status_code=status.HTTP_401_UNAUTHORIZED,
-                    detail=error_detail
-                ) from exc
-            except httpx.RequestError as exc:
-                raise HTTPException(
-                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-                    detail="Yandex OAuth service unavailable"
-                ) from exc
+            )
+            token_response.raise_for_status()
+            user_response.raise_for_status()
+            token_data = token_response.json()
+            user_data = user_response.json()
+
+            # Кэшируются только успешные ответы: после 401 запись не появится
+            yandex_info = {**token_data, **user_data}
+            _yandex_info_cache[cache_key] = yandex_info
+            return {
+                **yandex_info,
+                "access_token": access_token
+            }
+
+        except httpx.HTTPStatusError as exc:
+            if exc.response.status_code == status.HTTP_401_UNAUTHORIZED:
+                # Отозванный токен не должен и дальше проходить из кэша
+                _yandex_info_cache.pop(cache_key, None)
+            error_detail = f"Yandex API error: {exc.response.text}"
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED,
+                detail=error_detail
+            ) from exc
+        except httpx.RequestError as exc:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Yandex OAuth service unavailable"
+            ) from exc
 
     async def authenticate_user(self, yandex_token: str) -> User:
         """Аутентификация или регистрация пользователя через Yandex"""
@@ -77,8 +130,8 @@ class AuthService:
                         yandex_data.get('display_name') or 
                         yandex_data['default_email'].split('@')[0],
                 "access_token": yandex_token,
-                "token_expires": int((datetime.now() + timedelta(days=30)).timestamp()
-            )}
+                "token_expires": int(time.time()) + _YANDEX_TTL
+            }
 
             # Поиск или создание пользователя
             try:
@@ -102,15 +155,30 @@ class AuthService:
 
     async def _get_or_create_user(self, user_data: Dict[str, Any]) -> User:
         """Внутренний метод для поиска/создания пользователя"""
+        # Почти всегда пользователь уже есть и находится по yandex_id -
+        # одна проба уникального индекса; email проверяем только при промахе
         result = await self.session.execute(
-            select(User).where(
-                (User.yandex_id == user_data['yandex_id']) | 
-                (User.email == user_data['email'])
-            )
+            select(User).where(User.yandex_id == user_data['yandex_id']).limit(1)
         )
-        user = result.scalars().first()
+        user = result.scalar_one_or_none()
+        if user is None:
+            result = await self.session.execute(
+                select(User).where(User.email == user_data['email']).limit(1)
+            )
+            user = result.scalar_one_or_none()
 
         if user:
+            # Ничего не изменилось и срок токена не на исходе - без UPDATE/COMMIT
+            dirty = (
+                user.access_token != user_data['access_token']
+                or user.token_expires is None
+                or user.token_expires - time.time() < TOKEN_REFRESH_SKEW
+                or user.yandex_id != user_data['yandex_id']
+                or user.name != user_data['name']
+            )
+            if not dirty:
+                return user
+
             # Обновление существующего пользователя
             user.access_token = user_data['access_token']
             user.token_expires = user_data['token_expires']
@@ -137,14 +205,9 @@ class AuthService:
         """Создание JWT токена с обработкой ошибок"""
         try:
             to_encode = data.copy()
-            expire = datetime.utcnow() + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
-            to_encode.update({"exp": expire})
-            return jwt.encode(
-                to_encode, 
-                settings.SECRET_KEY, 
-                algorithm=settings.ALGORITHM
-            )
-        except (JWTError, ValidationError) as exc:
+            to_encode["exp"] = int(time.time()) + _ACCESS_TTL
+            return jwt.encode(to_encode, _SECRET, algorithm=_ALG)
+        except (PyJWTError, ValidationError) as exc:
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail=f"Token creation failed: {str(exc)}"
@@ -153,36 +216,38 @@ class AuthService:
     @staticmethod
     def verify_token(token: str) -> Dict[str, Any]:
         """Верификация JWT токена с детализированными ошибками"""
-        try:
-            payload = jwt.decode(
-                token, 
-                settings.SECRET_KEY, 
-                algorithms=[settings.auth.ALGORITHM],
+        cached = _jwt_cache.get(token)
+        if cached is not None:
+            # TTL кэша не должен пережить срок действия самого токена
+            if cached["exp"] > time.time():
+                return cached
+            _jwt_cache.pop(token, None)
 
-                options={"require": ["exp", "sub"]}
-            )
+        try:
+            payload = jwt.decode(token, _SECRET, algorithms=[_ALG], options=_DECODE_OPTS)
+            _jwt_cache[token] = payload
             return payload
-        except jwt.ExpiredSignatureError as exc:
+        except ExpiredSignatureError as exc:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Token has expired"
             ) from exc
-        except jwt.JWTClaimsError as exc:
+        except MissingRequiredClaimError as exc:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Invalid token claims"
             ) from exc
-        except JWTError as exc:
+        except InvalidTokenError as exc:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Invalid token"
             ) from exc
 
 # Фабрика для dependency injection
-async def get_auth_service():
+async def get_auth_service(request: Request):
     """Генератор сессий для инъекции зависимостей"""
     async with async_session_maker() as session:
         try:
-            yield AuthService(session)
+            yield AuthService(session, request.app.state.http)
         finally:
             await session.close()
\ No newline at end of file
@@ -0,0 +1,49 @@
+from contextlib import AsyncExitStack
+from typing import Any, Optional
+import logging
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Один S3-клиент на процесс (свой пул соединений), открывается в lifespan
+_s3_client: Optional[Any] = None
+_s3_stack: Optional[AsyncExitStack] = None
+
+def s3_enabled() -> bool:
+    return settings.audio.storage_backend == "s3"
+
+async def start_s3() -> None:
+    """Открывает общий клиент S3/MinIO (вызывается при старте приложения)"""
+    global _s3_client, _s3_stack
+    # aioboto3 нужен только для бэкенда s3, поэтому импорт здесь
+    import aioboto3
+    from botocore.config import Config
+
+    audio = settings.audio
+    secret = audio.s3_secret_access_key
+    stack = AsyncExitStack()
+    _s3_client = await stack.enter_async_context(
+        aioboto3.Session().client(
+            "s3",
+            endpoint_url=audio.s3_endpoint_url,
+            region_name=audio.s3_region,
+            aws_access_key_id=audio.s3_access_key_id,
+            aws_secret_access_key=secret.get_secret_value() if secret else None,
+            config=Config(max_pool_connections=audio.s3_max_pool_connections),
+        )
+    )
+    _s3_stack = stack
+    logger.info("S3 storage enabled, bucket: %s", audio.s3_bucket)
+
+async def close_s3() -> None:
+    global _s3_client, _s3_stack
+    if _s3_stack is not None:
+        await _s3_stack.aclose()
+    _s3_client = None
+    _s3_stack = None
+
+def get_s3():
+    if _s3_client is None:
+        raise RuntimeError("S3 client is not started")
+    return _s3_client
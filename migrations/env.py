@@ -29,7 +29,7 @@ def do_run_migrations(connection):
 def run_migrations_offline() -> None:
     """Run migrations in 'offline' mode."""
     context.configure(
-        url=settings.database.ASYNC_URL,
+        url=settings.database.async_url,
         target_metadata=target_metadata,
         literal_binds=True,
         dialect_opts={"paramstyle": "named"},
@@ -40,14 +40,14 @@ def run_migrations_offline() -> None:
 
 async def run_async_migrations_online() -> None:
     """Run migrations in 'online' mode with async engine."""
-    connectable = create_async_engine(settings.database.ASYNC_URL)
+    connectable = create_async_engine(settings.database.async_url)
 
     async with connectable.connect() as connection:
         await connection.run_sync(do_run_migrations)
 
 def run_migrations_online() -> None:
     """Run migrations in 'online' mode."""
-    if settings.database.ASYNC_URL:
+    if settings.database.async_url:
         import asyncio
         asyncio.run(run_async_migrations_online())
     else:
@@ -0,0 +1,29 @@
+"""audio_files.deleted_at for soft delete
+
+Revision ID: 0001_audio_files_deleted_at
+Revises: 
+Create Date: 2026-10-14 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0001_audio_files_deleted_at'
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Таблицы создаёт create_all при старте; на новой БД колонка уже есть
+    op.execute("ALTER TABLE audio_files ADD COLUMN IF NOT EXISTS deleted_at TIMESTAMPTZ NULL")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column("audio_files", "deleted_at")
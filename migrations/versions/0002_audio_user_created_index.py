@@ -0,0 +1,28 @@
+"""(user_id, created_at, id) index for newest-first audio pages
+
+Revision ID: 0002_audio_user_created_index
+Revises: 0001_audio_files_deleted_at
+Create Date: 2026-10-14 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0002_audio_user_created_index'
+down_revision: Union[str, None] = '0001_audio_files_deleted_at'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("CREATE INDEX IF NOT EXISTS ix_audio_user_created ON audio_files (user_id, created_at, id)")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_audio_user_created", table_name="audio_files")
@@ -0,0 +1,30 @@
+"""drop audio_files indexes covered by ix_audio_user_created and the primary key
+
+Revision ID: 0003_drop_redundant_audio_indexes
+Revises: 0002_audio_user_created_index
+Create Date: 2026-10-14 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0003_drop_redundant_audio_indexes'
+down_revision: Union[str, None] = '0002_audio_user_created_index'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # ix_audio_user_file - из create_all новых БД, ix_audio_files_user_id - из старых
+    op.execute("DROP INDEX IF EXISTS ix_audio_user_file")
+    op.execute("DROP INDEX IF EXISTS ix_audio_files_user_id")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.create_index("ix_audio_files_user_id", "audio_files", ["user_id"])
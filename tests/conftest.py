@@ -0,0 +1,48 @@
+import io
+import os
+import tempfile
+
+import pytest
+
+# Обязательные настройки до первого импорта app.*: тесты не требуют .env
+os.environ.setdefault("PROJECT_NAME", "test")
+os.environ.setdefault("DB_POSTGRES_USER", "test")
+os.environ.setdefault("DB_POSTGRES_PASSWORD", "test")
+os.environ.setdefault("DB_POSTGRES_DB", "test")
+os.environ.setdefault("SECRET_KEY", "test-secret")
+os.environ.setdefault("YANDEX_CLIENT_ID", "test")
+os.environ.setdefault("YANDEX_CLIENT_SECRET", "test")
+os.environ["AUDIO_STORAGE_BACKEND"] = "local"
+os.environ["AUDIO_UPLOAD_DIR"] = tempfile.mkdtemp(prefix="audio-tests-")
+
+from starlette.datastructures import Headers, UploadFile
+
+from app.services.audio import ensure_upload_dirs
+
+
+@pytest.fixture(scope="session", autouse=True)
+def upload_dirs():
+    ensure_upload_dirs()
+
+
+@pytest.fixture
+def make_upload():
+    def make(data: bytes = b"ID3 audio", filename: str = "track.mp3") -> UploadFile:
+        return UploadFile(
+            io.BytesIO(data),
+            size=len(data),
+            filename=filename,
+            headers=Headers({"content-type": "audio/mpeg"}),
+        )
+    return make
+
+
+@pytest.fixture(autouse=True)
+def fresh_upload_semaphore(monkeypatch):
+    # Семафор создаётся лениво и привязывается к loop; у каждого теста свой asyncio.run
+    import app.services.audio as audio
+    monkeypatch.setattr(audio, "_upload_semaphore", None)
+
+
+def stored_files(root: str):
+    return [os.path.join(d, f) for d, _, files in os.walk(root) for f in files]
@@ -0,0 +1,113 @@
+import asyncio
+import uuid
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from unittest import mock
+
+import pytest
+from sqlalchemy.sql.dml import Insert
+
+import app.services.audio as audio
+from app.core.config import settings
+from app.models.audio import AudioFile
+from app.services.audio import AudioService, _BULK_COLUMNS
+from tests.conftest import stored_files
+
+
+class FakeSession:
+    """AsyncSession без БД: запоминает вставленные строки и отдаёт их обратно в SELECT"""
+
+    def __init__(self, fail_on_insert: bool = False):
+        self.fail_on_insert = fail_on_insert
+        self.inserted = []
+        self.copy = mock.AsyncMock(side_effect=self._copy)
+        self.commit = mock.AsyncMock()
+        self.rollback = mock.AsyncMock()
+
+    async def _copy(self, table, records, columns):
+        if self.fail_on_insert:
+            raise RuntimeError("copy failed")
+        self.inserted.extend(dict(zip(columns, r)) for r in records)
+
+    async def connection(self):
+        raw = SimpleNamespace(driver_connection=SimpleNamespace(copy_records_to_table=self.copy))
+        return SimpleNamespace(get_raw_connection=mock.AsyncMock(return_value=raw))
+
+    async def execute(self, stmt, params=None):
+        if isinstance(stmt, Insert):
+            if self.fail_on_insert:
+                raise RuntimeError("insert failed")
+            self.inserted.extend(params)
+            self.executemany_rows = len(params)
+            return None
+        rows = [
+            AudioFile(**row, created_at=datetime.now(timezone.utc), updated_at=None, deleted_at=None)
+            for row in self.inserted
+        ]
+        return SimpleNamespace(scalars=lambda: SimpleNamespace(all=lambda: rows))
+
+
+def _save(files, session):
+    return asyncio.run(AudioService.save_audio_files_bulk(uuid.uuid4(), files, session))
+
+
+def test_bulk_below_threshold_uses_executemany(make_upload, monkeypatch):
+    monkeypatch.setattr(audio, "BULK_COPY_THRESHOLD", 3)
+    session = FakeSession()
+
+    result = _save([make_upload() for _ in range(2)], session)
+
+    assert len(result) == 2
+    assert session.executemany_rows == 2
+    session.copy.assert_not_awaited()
+    session.commit.assert_awaited_once()
+
+
+def test_bulk_at_threshold_uses_copy(make_upload, monkeypatch):
+    monkeypatch.setattr(audio, "BULK_COPY_THRESHOLD", 3)
+    session = FakeSession()
+    files = [make_upload(b"x" * (i + 1), f"t{i}.mp3") for i in range(3)]
+
+    result = _save(files, session)
+
+    session.copy.assert_awaited_once()
+    _, kwargs = session.copy.call_args
+    assert kwargs["columns"] == _BULK_COLUMNS
+    assert len(kwargs["records"]) == 3
+    # Порядок ответа совпадает с порядком файлов в запросе
+    assert [f.original_filename for f in result] == ["t0.mp3", "t1.mp3", "t2.mp3"]
+    assert [f.file_size for f in result] == [1, 2, 3]
+
+
+@pytest.mark.parametrize("threshold", [3, 100])
+def test_bulk_insert_failure_removes_written_files(make_upload, monkeypatch, threshold):
+    monkeypatch.setattr(audio, "BULK_COPY_THRESHOLD", threshold)
+    before = set(stored_files(settings.audio.upload_dir))
+    session = FakeSession(fail_on_insert=True)
+
+    with pytest.raises(RuntimeError):
+        _save([make_upload() for _ in range(3)], session)
+
+    assert set(stored_files(settings.audio.upload_dir)) == before
+    session.rollback.assert_awaited_once()
+    session.commit.assert_not_awaited()
+
+
+def test_bulk_write_failure_removes_other_files(make_upload, monkeypatch):
+    before = set(stored_files(settings.audio.upload_dir))
+    real_write = AudioService._write_upload
+
+    async def flaky_write(file, user_id):
+        if file.filename == "bad.mp3":
+            raise OSError("disk full")
+        return await real_write(file, user_id)
+
+    monkeypatch.setattr(AudioService, "_write_upload", staticmethod(flaky_write))
+    session = FakeSession()
+    files = [make_upload(), make_upload(filename="bad.mp3"), make_upload()]
+
+    with pytest.raises(OSError):
+        _save(files, session)
+
+    assert set(stored_files(settings.audio.upload_dir)) == before
+    assert session.inserted == []
@@ -0,0 +1,128 @@
+import asyncio
+import os
+import uuid
+from contextlib import asynccontextmanager
+from types import SimpleNamespace
+from unittest import mock
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy.sql.dml import Delete, Update
+
+import app.services.audio as audio
+from app.core.config import settings
+from app.db.session import get_async_session
+from app.routes.audio import router
+from app.routes.users import AuthedUser, get_current_user
+from app.services.audio import AudioService
+
+USER = AuthedUser(id=uuid.uuid4(), is_active=True, is_superuser=False)
+
+
+class FakeSession:
+    """Отдаёт заданные результаты по очереди и запоминает выполненные запросы"""
+
+    def __init__(self, *results):
+        self.results = list(results)
+        self.statements = []
+        self.commit = mock.AsyncMock()
+
+    async def execute(self, stmt, params=None):
+        self.statements.append(stmt)
+        return self.results.pop(0) if self.results else None
+
+
+def _returning(file_path):
+    return SimpleNamespace(first=lambda: SimpleNamespace(file_path=file_path) if file_path else None)
+
+
+def _stored_file(name="gone.mp3"):
+    path = os.path.join(settings.audio.upload_dir, "00", name)
+    with open(path, "wb") as f:
+        f.write(b"audio")
+    return path
+
+
+def _purge_sessions(monkeypatch):
+    """Подменяет async_session_maker, которым purge открывает свою сессию"""
+    opened = []
+
+    @asynccontextmanager
+    async def session_maker():
+        session = FakeSession()
+        opened.append(session)
+        yield session
+
+    monkeypatch.setattr(audio, "async_session_maker", session_maker)
+    return opened
+
+
+def _client(session):
+    app = FastAPI()
+    app.include_router(router)
+    app.dependency_overrides[get_current_user] = lambda: USER
+    app.dependency_overrides[get_async_session] = lambda: session
+    return TestClient(app)
+
+
+def test_delete_soft_deletes_then_purges(monkeypatch):
+    path = _stored_file()
+    purge_sessions = _purge_sessions(monkeypatch)
+    session = FakeSession(_returning(path))
+
+    response = _client(session).delete(f"/audio/{uuid.uuid4()}")
+
+    assert response.status_code == 204
+    # Сам запрос - только UPDATE ... SET deleted_at
+    assert [type(s) for s in session.statements] == [Update]
+    session.commit.assert_awaited_once()
+    # Фоновая задача стёрла файл и удалила строку в своей сессии
+    assert not os.path.exists(path)
+    assert [type(s) for s in purge_sessions[0].statements] == [Delete]
+    purge_sessions[0].commit.assert_awaited_once()
+
+
+def test_delete_unknown_file_is_404_without_purge(monkeypatch):
+    purge_sessions = _purge_sessions(monkeypatch)
+
+    response = _client(FakeSession(_returning(None))).delete(f"/audio/{uuid.uuid4()}")
+
+    assert response.status_code == 404
+    assert purge_sessions == []
+
+
+def test_purge_keeps_row_when_storage_fails(monkeypatch, caplog):
+    purge_sessions = _purge_sessions(monkeypatch)
+    monkeypatch.setattr(
+        AudioService, "_remove_stored", staticmethod(mock.AsyncMock(side_effect=PermissionError("denied")))
+    )
+    file_id = uuid.uuid4()
+
+    asyncio.run(AudioService.purge_audio_file(file_id, "/data/x.mp3"))
+
+    assert purge_sessions == []
+    assert str(file_id) in caplog.text and "/data/x.mp3" in caplog.text
+
+
+def test_purge_missing_file_still_deletes_row(monkeypatch):
+    purge_sessions = _purge_sessions(monkeypatch)
+
+    asyncio.run(AudioService.purge_audio_file(uuid.uuid4(), os.path.join(settings.audio.upload_dir, "missing.mp3")))
+
+    assert [type(s) for s in purge_sessions[0].statements] == [Delete]
+
+
+def test_purge_deleted_files_sweeps_stale_rows(monkeypatch):
+    stale = [SimpleNamespace(id=uuid.uuid4(), file_path=f"/data/{i}.mp3") for i in range(2)]
+    sweep_session = FakeSession(SimpleNamespace(all=lambda: stale))
+
+    @asynccontextmanager
+    async def session_maker():
+        yield sweep_session
+
+    monkeypatch.setattr(audio, "async_session_maker", session_maker)
+    purge = mock.AsyncMock()
+    monkeypatch.setattr(AudioService, "purge_audio_file", staticmethod(purge))
+
+    assert asyncio.run(AudioService.purge_deleted_files()) == 2
+    assert [c.args for c in purge.await_args_list] == [(r.id, r.file_path) for r in stale]
@@ -0,0 +1,56 @@
+import asyncio
+import tempfile
+import uuid
+from types import SimpleNamespace
+
+import pytest
+from starlette.datastructures import Headers, UploadFile
+
+import app.services.audio as audio
+from app.core.config import settings
+from app.services.audio import AudioService
+
+
+@pytest.fixture
+def kernel_copy_on(monkeypatch):
+    audio_settings = settings.audio.model_copy(update={"kernel_copy_uploads": True})
+    monkeypatch.setattr(audio, "settings", SimpleNamespace(audio=audio_settings))
+
+
+def _write(file):
+    return asyncio.run(AudioService._write_upload(file, uuid.uuid4()))
+
+
+def test_kernel_copy_skips_uploads_without_fd(kernel_copy_on, make_upload):
+    # BytesIO без _rolled и без fileno(): только обычная запись кусками
+    _, path, size = _write(make_upload(b"in memory"))
+
+    assert size == 9
+    with open(path, "rb") as f:
+        assert f.read() == b"in memory"
+
+
+def test_kernel_copy_skips_spool_in_memory(kernel_copy_on):
+    spool = tempfile.SpooledTemporaryFile(max_size=1024)
+    spool.write(b"small")
+    spool.seek(0)
+    upload = UploadFile(spool, size=5, filename="a.mp3", headers=Headers({"content-type": "audio/mpeg"}))
+
+    assert not audio._can_kernel_copy(upload)
+    assert _write(upload)[2] == 5
+    # Проверка не должна была сбросить spool на диск
+    assert not spool._rolled
+
+
+@pytest.mark.skipif(not audio._HAS_KERNEL_COPY, reason="sendfile only on Linux")
+def test_kernel_copy_used_for_spool_on_disk(kernel_copy_on):
+    spool = tempfile.SpooledTemporaryFile(max_size=1)
+    spool.write(b"rolled to disk")
+    spool.seek(0)
+    upload = UploadFile(spool, size=14, filename="a.mp3", headers=Headers({"content-type": "audio/mpeg"}))
+
+    assert audio._can_kernel_copy(upload)
+    _, path, size = _write(upload)
+    assert size == 14
+    with open(path, "rb") as f:
+        assert f.read() == b"rolled to disk"
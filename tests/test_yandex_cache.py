@@ -0,0 +1,68 @@
+import asyncio
+from types import SimpleNamespace
+
+import httpx
+import pytest
+from fastapi import HTTPException
+
+import app.services.auth as auth
+from app.routes.auth import get_yandex_user_info
+from app.services.auth import AuthService
+
+TOKEN = "revoked-token"
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    auth._yandex_info_cache.clear()
+    yield
+    auth._yandex_info_cache.clear()
+
+
+def _client(handler) -> httpx.AsyncClient:
+    return httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+
+def _prime_cache():
+    auth._yandex_info_cache[auth._yandex_cache_key(TOKEN)] = {"user_id": "1", "default_email": "a@ya.ru"}
+
+
+def test_route_401_from_yandex_drops_cached_info():
+    _prime_cache()
+    client = _client(lambda request: httpx.Response(401, json={"error_description": "revoked"}))
+    request = SimpleNamespace(app=SimpleNamespace(state=SimpleNamespace(http=client)))
+
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(get_yandex_user_info(request, TOKEN))
+
+    assert exc.value.status_code == 401
+    assert auth._yandex_cache_key(TOKEN) not in auth._yandex_info_cache
+
+
+def test_service_401_from_yandex_drops_cached_info():
+    def handler(request):
+        # Параллельный запрос успел закэшировать токен, пока этот ждал Яндекс
+        _prime_cache()
+        return httpx.Response(401, json={"error": "invalid_token"})
+
+    service = AuthService(session=None, http_client=_client(handler))
+
+    with pytest.raises(HTTPException) as exc:
+        asyncio.run(service.get_yandex_user_info(TOKEN))
+
+    assert exc.value.status_code == 401
+    assert auth._yandex_cache_key(TOKEN) not in auth._yandex_info_cache
+
+
+def test_service_caches_successful_response():
+    def handler(request):
+        if request.url.host == "oauth.yandex.ru":
+            return httpx.Response(200, json={"expires_in": 3600})
+        return httpx.Response(200, json={"id": "1", "default_email": "a@ya.ru"})
+
+    service = AuthService(session=None, http_client=_client(handler))
+
+    info = asyncio.run(service.get_yandex_user_info(TOKEN))
+
+    assert info["access_token"] == TOKEN
+    assert auth._yandex_cache_key(TOKEN) in auth._yandex_info_cache